@@ -0,0 +1,16 @@
+"""
+Gunicorn configuration for the PDF-to-Audio API.
+
+A single worker process keeps one copy of the TTS models in memory, while its
+threads let concurrent requests overlap Groq network waits with TTS inference.
+
+Usage:
+    gunicorn -c gunicorn_conf.py
+"""
+
+wsgi_app = "wsgi:app"
+bind = "0.0.0.0:4567"
+workers = 1
+worker_class = "gthread"
+threads = 8
+timeout = 300  # Worker heartbeat timeout; gthread workers don't cut off long-running requests
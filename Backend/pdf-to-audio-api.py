@@ -10,26 +10,37 @@ This Flask API provides endpoints for:
 
 Usage:
     python pdf-to-audio-api.py
+    gunicorn -c gunicorn_conf.py  (production, see gunicorn_conf.py)
 """
 
 import os
-import json
+import logging
 import time
 import re
 import base64
 import tempfile
 import threading
 import concurrent.futures
+import sqlite3
+import hashlib
+import difflib
+from collections import OrderedDict
+from contextlib import contextmanager
 from queue import Queue
-from datetime import datetime
 from dotenv import load_dotenv
 import tiktoken  # For token counting
-from flask import Flask, request, jsonify, send_file
+import orjson  # Faster JSON parsing/serialization for large segment payloads
+from flask import Flask, request, jsonify, send_from_directory
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
+from werkzeug.utils import secure_filename
+from werkzeug.exceptions import NotFound
 import groq
 from kokoro import KPipeline
 import soundfile as sf
 import numpy as np
+import torch
+from numba import njit
 from pydub import AudioSegment
 from pydub.utils import which
 
@@ -37,6 +48,10 @@ from pydub.utils import which
 dotenv_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
 load_dotenv(dotenv_path)
 
+# Configure logging (set LOG_LEVEL=DEBUG in .env to log full LLM prompts and responses)
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper())
+logger = logging.getLogger(__name__)
+
 # Check if GROQ_API_KEY is set
 if not os.environ.get("GROQ_API_KEY"):
     print("[Error] GROQ_API_KEY environment variable is not set. Please add it to your .env file.")
@@ -44,16 +59,35 @@ if not os.environ.get("GROQ_API_KEY"):
 
 # Constants
 MAX_TOKENS = 100000       # For LLM call (assumes each page is below this limit)
+GROQ_MAX_OUTPUT_TOKENS = 32768  # Completion token limit for Groq calls
+# Page tokens per batched Groq request: the model echoes the text verbatim, so leave room for the JSON around it
+GROQ_BATCH_TOKEN_BUDGET = int(0.8 * GROQ_MAX_OUTPUT_TOKENS)
+SEGMENT_MATCH_THRESHOLD = 0.9  # Minimum word similarity between a batched page's segments and its input text
 RETRY_LIMIT = 3           # Number of times to retry the API call
 TTS_MAX_TOKENS = 100      # Maximum token capacity for Kokoro TTS input per chunk
 AUDIO_CACHE_DIR = "audio_cache"  # Directory to cache generated audio files
-MAX_WORKERS = 4           # Maximum number of parallel workers for audio generation
+TTS_BATCH_SIZE = 8        # Maximum number of chunks synthesized in a single Kokoro forward pass
+TTS_MAX_PHONEMES = 510    # Kokoro's context length in phonemes (longer chunks go through the pipeline)
+TTS_SAMPLE_RATE = 24000   # Kokoro output sample rate in Hz
+TTS_PIPELINES_PER_VOICE = 2  # Preloaded Kokoro pipelines per voice (1-2 on CPU, more on GPU)
+CHUNK_AUDIO_CACHE_SIZE = 512  # Maximum number of synthesized chunks kept in memory
+MAX_PAGE_WORKERS = 4      # Maximum number of pages processed concurrently by /api/process-pages
 
 # Create cache directory if it doesn't exist
 os.makedirs(AUDIO_CACHE_DIR, exist_ok=True)
 
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider that uses orjson to parse requests and serialize responses."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 # Initialize Flask app
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)  # Enable CORS for all routes
 
 # Initialize Groq client
@@ -63,21 +97,76 @@ groq_client = groq.Groq(api_key=os.environ.get("GROQ_API_KEY"))
 if not which("ffmpeg"):
     print("[Error] ffmpeg not found. Please install ffmpeg for audio merging to work properly.")
 
+# Splits segment text into words, keeping punctuation attached
+_WORDS_RE = re.compile(r'\S+')
+
+# Translation table that strips the punctuation used to estimate speech pauses
+_PUNCTUATION_TABLE = str.maketrans('', '', ".,;:!?-")
+
 # Initialize tiktoken encoding (will be loaded on first use)
 _encoding = None
 
-# Create a global TTS pipeline object to reuse
-_tts_pipelines = {}
-_tts_pipelines_lock = threading.Lock()
+# Pools of preloaded TTS pipelines per voice. Each request checks a pipeline out for
+# the duration of its synthesis, so up to TTS_PIPELINES_PER_VOICE requests run in parallel
+_tts_pools = {}
+_tts_pools_lock = threading.Lock()
+
+# Split the CPU cores between the pooled pipelines so concurrent syntheses don't
+# each spin up a full set of intra-op threads and oversubscribe the machine
+torch.set_num_threads(max(1, (os.cpu_count() or 1) // TTS_PIPELINES_PER_VOICE))
+
+def get_tts_pool(voice="af_heart"):
+    """Get or initialize the pool of TTS pipelines for a specific voice."""
+    with _tts_pools_lock:
+        pool = _tts_pools.get(voice)
+    if pool is not None:
+        return pool
+
+    # Load the models outside the lock so requests for already-initialized voices aren't blocked
+    print(f"Initializing {TTS_PIPELINES_PER_VOICE} TTS pipelines for voice: {voice}")
+    pool = Queue()
+    for _ in range(TTS_PIPELINES_PER_VOICE):
+        pool.put(KPipeline(lang_code='a'))
+
+    # If another thread initialized the same voice meanwhile, keep its pool and drop ours
+    with _tts_pools_lock:
+        return _tts_pools.setdefault(voice, pool)
+
+@contextmanager
+def tts_pipeline(voice="af_heart"):
+    """Check a TTS pipeline out of the voice's pool, blocking until one is free."""
+    pool = get_tts_pool(voice)
+    pipeline = pool.get()
+    try:
+        yield pipeline
+    finally:
+        pool.put(pipeline)
+
+# In-memory LRU cache of synthesized chunk audio, keyed on (chunk text, voice)
+_chunk_audio_cache = OrderedDict()
+_chunk_audio_cache_lock = threading.Lock()
 
-def get_tts_pipeline(voice="af_heart"):
-    """Get or initialize the TTS pipeline for a specific voice."""
-    global _tts_pipelines
-    with _tts_pipelines_lock:
-        if voice not in _tts_pipelines:
-            print(f"Initializing TTS pipeline for voice: {voice}")
-            _tts_pipelines[voice] = KPipeline(lang_code='a')
-        return _tts_pipelines[voice]
+def chunk_cache_key(chunk, voice):
+    """Build the chunk audio cache key for a text chunk and voice."""
+    return hashlib.md5(f"{chunk}|{voice}".encode()).digest()
+
+def get_cached_chunk_audio(chunk, voice):
+    """Return cached audio for a chunk, or None if it hasn't been synthesized yet."""
+    key = chunk_cache_key(chunk, voice)
+    with _chunk_audio_cache_lock:
+        audio = _chunk_audio_cache.get(key)
+        if audio is not None:
+            _chunk_audio_cache.move_to_end(key)
+        return audio
+
+def cache_chunk_audio(chunk, voice, audio):
+    """Store synthesized chunk audio, evicting the least recently used entries."""
+    key = chunk_cache_key(chunk, voice)
+    with _chunk_audio_cache_lock:
+        _chunk_audio_cache[key] = audio
+        _chunk_audio_cache.move_to_end(key)
+        while len(_chunk_audio_cache) > CHUNK_AUDIO_CACHE_SIZE:
+            _chunk_audio_cache.popitem(last=False)
 
 def get_encoding():
     """Get or initialize the tiktoken encoding."""
@@ -98,14 +187,16 @@ def count_tokens(text):
     else:
         return len(text) // 4
 
-def split_text_by_tokens(text, max_tokens):
+def split_text_by_tokens(text, max_tokens, tokens=None):
     """
     Splits text into chunks such that each chunk is no more than max_tokens tokens.
+    Pass `tokens` when the text has already been encoded to avoid encoding it again.
     """
     encoding = get_encoding()
     if not encoding:
         return [text]
-    tokens = encoding.encode(text)
+    if tokens is None:
+        tokens = encoding.encode(text)
     chunks = []
     for i in range(0, len(tokens), max_tokens):
         chunk_tokens = tokens[i:i+max_tokens]
@@ -113,6 +204,43 @@ def split_text_by_tokens(text, max_tokens):
         chunks.append(chunk_text)
     return chunks
 
+def request_groq_json(system_prompt: str, user_prompt: str, label: str):
+    """
+    Sends one JSON-mode chat completion to the Groq API and returns the parsed response.
+    `label` identifies the request in log messages (e.g. "page 3").
+    Returns None if the call fails or the response isn't valid JSON.
+    """
+    # Log the full prompts being sent to the LLM (debug only; they can be very large)
+    logger.debug("System prompt for %s:\n%s\n", label, system_prompt)
+    logger.debug("User prompt for %s:\n%s\n", label, user_prompt)
+
+    # Counting tokens re-encodes the whole prompt, so only do it when it will be logged
+    if logger.isEnabledFor(logging.DEBUG):
+        input_tokens = count_tokens(system_prompt) + count_tokens(user_prompt)
+        logger.debug("Request contains %d tokens for %s.", input_tokens, label)
+
+    try:
+        # Using Meta Llama 3 128K model which can handle up to 128K tokens
+        response = groq_client.chat.completions.create(
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            model="llama-3.3-70b-versatile",  # Using the 128K token context model
+            temperature=0,
+            max_tokens=GROQ_MAX_OUTPUT_TOKENS,  # Using a high value, well within model's capacity
+            response_format={"type": "json_object"}  # Enable JSON mode
+        )
+        
+        raw_content = response.choices[0].message.content
+        logger.debug("Raw JSON output for %s:\n%s\n", label, raw_content)
+        
+        # Since we're using JSON mode, the response should always be valid JSON
+        return orjson.loads(raw_content)
+    except Exception as e:
+        print(f"[Error] Exception calling Groq API for {label}: {e}")
+        return None
+
 def call_groq_api(page_text: str, page_number: int) -> dict:
     """
     Makes a single call to the Groq API to convert the page text into an audio book JSON structure.
@@ -143,38 +271,11 @@ def call_groq_api(page_text: str, page_number: int) -> dict:
         "Do not omit any content:\n\n" + page_text
     )
 
-    # Log the full prompts being sent to the LLM
-    print(f"System prompt for page {page_number}:\n{system_prompt}\n")
-    print(f"User prompt for page {page_number}:\n{user_prompt}\n")
-
-    input_tokens = count_tokens(system_prompt) + count_tokens(user_prompt)
-    print(f"Request contains {input_tokens} tokens for page {page_number}.")
-
-    try:
-        # Using Meta Llama 3 128K model which can handle up to 128K tokens
-        response = groq_client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            model="llama-3.3-70b-versatile",  # Using the 128K token context model
-            temperature=0,
-            max_tokens=32768,  # Using a high value, well within model's capacity
-            response_format={"type": "json_object"}  # Enable JSON mode
-        )
-        
-        raw_content = response.choices[0].message.content
-        print(f"Raw JSON output for page {page_number}:\n{raw_content}\n")
-        
-        # Since we're using JSON mode, the response should always be valid JSON
-        data = json.loads(raw_content)
-        if not isinstance(data, dict) or "segments" not in data:
-            print(f"[Error] Invalid JSON structure for page {page_number}. Expected a dict with 'segments'.")
-            return {}
-        return data
-    except Exception as e:
-        print(f"[Error] Exception calling Groq API for page {page_number}: {e}")
+    data = request_groq_json(system_prompt, user_prompt, f"page {page_number}")
+    if not isinstance(data, dict) or "segments" not in data:
+        print(f"[Error] Invalid JSON structure for page {page_number}. Expected a dict with 'segments'.")
         return {}
+    return data
 
 def get_audio_book_segment(page_text: str, page_number: int, attempts=RETRY_LIMIT) -> dict:
     """
@@ -190,98 +291,357 @@ def get_audio_book_segment(page_text: str, page_number: int, attempts=RETRY_LIMI
     print(f"[Error] All {attempts} attempts failed for page {page_number}. Skipping this page.")
     return {}
 
-def process_chunk(chunk, voice, chunk_index, total_chunks, results_queue):
-    """Process a single TTS chunk in a separate thread."""
+def call_groq_api_batch(pages: list) -> dict:
+    """
+    Makes a single call to the Groq API to convert several pages into audio book JSON structures.
+    `pages` is a list of (page_number, page_text) tuples.
+    Returns a dict mapping page number to its segments, or {} on error.
+    
+    Sharing one request amortizes the system prompt and network round trip across pages.
+    """
+    system_prompt = (
+        "You are an assistant that converts extracted text from a book into a structured audio book script. "
+        "The input contains several pages, each starting with a line of the form \"=== PAGE <page number> ===\". "
+        "Output a single JSON object in the following format:\n"
+        "{\n  \"pages\": [\n"
+        "    {\"page\": <page number>, \"segments\": [\n"
+        "      {\"speaker\": \"Narrator\", \"text\": \"<full text of the page split into segments (each no more than 100 tokens)>\"}\n"
+        "    ]}\n"
+        "  ]\n}\n\n"
+        "IMPORTANT:\n"
+        "1. Do NOT summarize, rephrase, or rewrite any text.\n"
+        "2. Do NOT skip, omit, or truncate any portion of the text.\n"
+        "3. Split each page's full text into multiple segments such that each segment is no more than 100 tokens, "
+        "and the concatenation of a page's segments exactly reproduces that page's text (including all paragraphs and punctuation).\n"
+        "4. Use the speaker \"Narrator\" for every segment.\n"
+        "5. Even if the final segment of a page is very short, include it in its entirety.\n"
+        "6. Include exactly one entry per input page, in the same order, with its page number. Never move text between pages.\n"
+        "Return valid JSON and nothing else."
+    )
+
+    page_numbers = [page_number for page_number, _ in pages]
+    user_prompt = (
+        "Convert each of the following pages of extracted text into the JSON format described. "
+        "Split each page into segments so that each segment is no more than 100 tokens and the concatenation of a page's segments exactly equals that page's text. "
+        "Use the speaker \"Narrator\" for every segment. Do not summarize, rephrase, or change any part of the text. "
+        "Do not omit any content:\n\n"
+        + "\n\n".join(f"=== PAGE {page_number} ===\n{page_text}" for page_number, page_text in pages)
+    )
+
+    data = request_groq_json(system_prompt, user_prompt, f"pages {page_numbers}")
+    if not isinstance(data, dict) or not isinstance(data.get("pages"), list):
+        print(f"[Error] Invalid JSON structure for pages {page_numbers}. Expected a dict with 'pages'.")
+        return {}
+    
+    page_segments = {}
+    for page in data["pages"]:
+        if not isinstance(page, dict) or not page.get("segments"):
+            continue
+        try:
+            page_number = int(page.get("page"))
+        except (TypeError, ValueError):
+            continue
+        if page_number in page_numbers:
+            page_segments[page_number] = page["segments"]
+    return page_segments
+
+def get_audio_book_segments_batch(pages: list, attempts=RETRY_LIMIT) -> dict:
+    """
+    Retries the batched Groq API call up to `attempts` times.
+    Returns a dict mapping page number to segments (pages the model dropped are omitted).
+    """
+    page_numbers = [page_number for page_number, _ in pages]
+    for attempt in range(1, attempts + 1):
+        page_segments = call_groq_api_batch(pages)
+        if page_segments:
+            return page_segments
+        print(f"[Warning] Attempt {attempt} failed for pages {page_numbers}, retrying...")
+        time.sleep(1)
+    print(f"[Error] All {attempts} attempts failed for pages {page_numbers}.")
+    return {}
+
+def phonemize_chunk(pipeline, chunk):
+    """Convert a text chunk into phonemes using the pipeline's G2P."""
+    phonemes, _ = pipeline.g2p(chunk)
+    return phonemes
+
+def synthesize_batch(pipeline, chunks, voice):
+    """
+    Synthesizes several text chunks with a batched Kokoro forward pass.
+    Returns a list of numpy arrays in the same order as chunks (None for chunks without phonemes).
+    
+    The duration LSTM is packed so predicted durations match per-chunk synthesis. The frame-level
+    stages (F0/energy prediction and the decoder) run once over the batch padded to the longest chunk,
+    and each chunk's audio is trimmed to its frame count. They normalize over time, so the audio can
+    differ slightly from synthesizing a chunk on its own.
+    """
+    model = pipeline.model
+    device = next(model.parameters()).device
+    pack = pipeline.load_voice(voice).to(device)
+
+    phonemes = [phonemize_chunk(pipeline, chunk) for chunk in chunks]
+    results = [None] * len(chunks)
+    batch_indices = []
+    for i, ps in enumerate(phonemes):
+        if len(ps) > TTS_MAX_PHONEMES:
+            # Too long for one forward pass; the pipeline splits it and speaks all of it
+            results[i] = synthesize_chunk(pipeline, chunks[i], voice)
+        elif ps:
+            batch_indices.append(i)
+    if not batch_indices:
+        return results
+
+    # Build padded input ids (with Kokoro's boundary token 0 on both sides)
+    sequences = []
+    ref_styles = []
+    for i in batch_indices:
+        ids = [model.vocab[p] for p in phonemes[i] if p in model.vocab]
+        sequences.append(torch.LongTensor([0, *ids, 0]))
+        ref_styles.append(pack[len(phonemes[i]) - 1])
+    input_lengths = torch.LongTensor([len(seq) for seq in sequences])
+    input_ids = torch.nn.utils.rnn.pad_sequence(sequences, batch_first=True, padding_value=0).to(device)
+    ref_s = torch.stack(ref_styles).reshape(len(sequences), -1)
+    text_mask = torch.arange(input_ids.shape[1]).unsqueeze(0)
+    text_mask = torch.gt(text_mask + 1, input_lengths.unsqueeze(1)).to(device)
+
+    with torch.no_grad():
+        bert_dur = model.bert(input_ids, attention_mask=(~text_mask).int())
+        d_en = model.bert_encoder(bert_dur).transpose(-1, -2)
+        s = ref_s[:, 128:]
+        d = model.predictor.text_encoder(d_en, s, input_lengths.to(device), text_mask)
+        x = torch.nn.utils.rnn.pack_padded_sequence(d, input_lengths, batch_first=True, enforce_sorted=False)
+        x, _ = model.predictor.lstm(x)
+        x, _ = torch.nn.utils.rnn.pad_packed_sequence(x, batch_first=True, total_length=input_ids.shape[1])
+        duration = torch.sigmoid(model.predictor.duration_proj(x)).sum(axis=-1)
+        pred_dur = torch.round(duration).clamp(min=1).long()
+        pred_dur = pred_dur.masked_fill(text_mask, 0)
+        t_en = model.text_encoder(input_ids, input_lengths.to(device), text_mask)
+
+        # Expand every sequence to frame level, padding to the longest one
+        frame_counts = pred_dur.sum(axis=-1).tolist()
+        max_frames = max(frame_counts)
+        pred_aln_trg = torch.zeros((len(sequences), input_ids.shape[1], max_frames), device=device)
+        for b, frames in enumerate(frame_counts):
+            indices = torch.repeat_interleave(torch.arange(input_ids.shape[1], device=device), pred_dur[b])
+            pred_aln_trg[b, indices, torch.arange(frames, device=device)] = 1
+
+        en = d.transpose(-1, -2) @ pred_aln_trg
+        F0_pred, N_pred = model.predictor.F0Ntrain(en, s)
+        asr = t_en @ pred_aln_trg
+        audio = model.decoder(asr, F0_pred, N_pred, ref_s[:, :128]).reshape(len(sequences), -1)
+
+    # Split the padded batch output back into per-chunk audio
+    samples_per_frame = audio.shape[-1] // max_frames
+    audio = audio.cpu().numpy()
+    if len(batch_indices) == 1:
+        # A single sequence has no padding, so its output can be used as is
+        results[batch_indices[0]] = audio[0]
+        return results
+    for b, i in enumerate(batch_indices):
+        # Copy so cached chunks don't keep the whole padded batch alive
+        results[i] = audio[b, :frame_counts[b] * samples_per_frame].copy()
+    return results
+
+def synthesize_chunk(pipeline, chunk, voice):
+    """Synthesizes a single text chunk through the regular pipeline (fallback for batching)."""
+    audio_chunks = []
+    for (gs, ps, audio) in pipeline(chunk, voice=voice):
+        if audio is not None:
+            audio_chunks.append(audio.cpu().numpy() if torch.is_tensor(audio) else audio)
+    if not audio_chunks:
+        return None
+    # Skip the copy np.concatenate would make for the common single-segment case
+    return audio_chunks[0] if len(audio_chunks) == 1 else np.concatenate(audio_chunks)
+
+def synthesize_chunks(pipeline, chunks, voice):
+    """Synthesizes chunks in one batch, falling back to per-chunk synthesis if batching fails."""
     try:
-        chunk_token_count = count_tokens(chunk)
-        print(f"Synthesizing chunk {chunk_index}/{total_chunks} with {chunk_token_count} tokens...")
-        
-        # Use the global pipeline for better performance
-        pipeline = get_tts_pipeline(voice)
-        generator = pipeline(chunk, voice=voice)
-        
-        audio_chunks = []
-        for (gs, ps, audio) in generator:
-            audio_chunks.append(audio)
-        
-        if not audio_chunks:
-            print(f"[Warning] No audio was generated for chunk {chunk_index}.")
-            results_queue.put((chunk_index, None))
-            return
-        
-        # Concatenate numpy arrays
-        all_audio = np.concatenate(audio_chunks)
-        
-        # Audio processing complete for this chunk
-        results_queue.put((chunk_index, all_audio))
+        return synthesize_batch(pipeline, chunks, voice)
     except Exception as e:
-        print(f"[Error] Exception processing chunk {chunk_index}: {e}")
-        results_queue.put((chunk_index, None))
+        logger.warning("Batched synthesis failed (%s: %s), falling back to per-chunk synthesis.", type(e).__name__, e, exc_info=True)
+    results = []
+    for chunk in chunks:
+        try:
+            results.append(synthesize_chunk(pipeline, chunk, voice))
+        except Exception as e:
+            print(f"[Error] Exception processing chunk: {e}")
+            results.append(None)
+    return results
 
-def synthesize_audio_parallel(text: str, output_filename: str, voice: str = "af_heart"):
+def synthesize_audio_parallel(text: str, output_filename: str, voice: str = "af_heart", tokens=None):
     """
-    Synthesizes audio from text using Kokoro TTS with parallel processing.
+    Synthesizes audio from text using Kokoro TTS with batched inference.
+    Pass `tokens` (the tiktoken encoding of text) when already available to avoid re-encoding.
+    Returns the number of samples written, or 0 if no audio was generated.
     """
-    token_count = count_tokens(text)
+    token_count = len(tokens) if tokens is not None else count_tokens(text)
     
     if token_count <= TTS_MAX_TOKENS:
-        # For short text, just process directly
-        pipeline = get_tts_pipeline(voice)
-        generator = pipeline(text, voice=voice)
-        audio_chunks = []
-        for (gs, ps, audio) in generator:
-            audio_chunks.append(audio)
-        if audio_chunks:
-            # Concatenate audio chunks
-            all_audio = np.concatenate(audio_chunks)
-            sf.write(output_filename, all_audio, 24000)
-            print(f"Saved audio to: {output_filename}")
-            return
-        else:
-            print("[Warning] No audio was generated for the given text.")
-            return
-
-    print(f"Text has {token_count} tokens which exceeds the TTS maximum of {TTS_MAX_TOKENS} tokens. Splitting text into chunks...")
-    chunks = split_text_by_tokens(text, TTS_MAX_TOKENS)
+        chunks = [text]
+    else:
+        print(f"Text has {token_count} tokens which exceeds the TTS maximum of {TTS_MAX_TOKENS} tokens. Splitting text into chunks...")
+        chunks = split_text_by_tokens(text, TTS_MAX_TOKENS, tokens)
     total_chunks = len(chunks)
-    print(f"Split text into {total_chunks} chunks for parallel processing.")
+    print(f"Split text into {total_chunks} chunks for batched processing.")
 
-    # Use a thread-safe queue to collect results
-    results_queue = Queue()
-    
-    # Create thread pool
-    with concurrent.futures.ThreadPoolExecutor(max_workers=min(MAX_WORKERS, total_chunks)) as executor:
-        # Submit tasks
-        futures = []
-        for i, chunk in enumerate(chunks, start=1):
-            future = executor.submit(process_chunk, chunk, voice, i, total_chunks, results_queue)
-            futures.append(future)
-        
-        # Wait for all futures to complete
-        concurrent.futures.wait(futures)
-    
-    # Collect results in the correct order
-    results = [None] * total_chunks
-    while not results_queue.empty():
-        idx, audio = results_queue.get()
-        results[idx-1] = audio
+    # Reuse audio for chunks that were already synthesized (repeated headers, footers, etc.)
+    results = [get_cached_chunk_audio(chunk, voice) for chunk in chunks]
+    pending = [i for i, audio in enumerate(results) if audio is None]
+    if len(pending) < total_chunks:
+        print(f"Using cached audio for {total_chunks - len(pending)}/{total_chunks} chunks.")
+
+    if pending:
+        # Run all batches sequentially on one pipeline; batching provides the parallelism
+        with tts_pipeline(voice) as pipeline:
+            for start in range(0, len(pending), TTS_BATCH_SIZE):
+                batch_indices = pending[start:start + TTS_BATCH_SIZE]
+                batch = [chunks[i] for i in batch_indices]
+                logger.debug("Synthesizing %d chunks (%d/%d) in one batch", len(batch), start + len(batch), len(pending))
+                batch_audio = synthesize_chunks(pipeline, batch, voice)
+                for i, audio in zip(batch_indices, batch_audio):
+                    if audio is not None:
+                        cache_chunk_audio(chunks[i], voice, audio)
+                    results[i] = audio
     
     # Filter out None values (failed chunks)
     valid_results = [r for r in results if r is not None]
     
     if not valid_results:
         print("[Error] No audio was generated for any chunks.")
-        return
+        return 0
     
-    # Concatenate all audio chunks in the correct order
-    final_audio = np.concatenate(valid_results)
+    # Copy all audio chunks in the correct order into one preallocated buffer,
+    # quantizing to 16-bit PCM (clipped so out-of-range samples don't wrap around, and
+    # rounded like libsndfile; the int16 assignment alone would truncate toward zero)
+    offsets = np.cumsum([0] + [len(audio) for audio in valid_results])
+    final_audio = np.empty(offsets[-1], dtype=np.int16)
+    for audio, start, end in zip(valid_results, offsets[:-1], offsets[1:]):
+        final_audio[start:end] = np.rint(np.clip(audio, -1.0, 1.0) * 32767)
     
     # Write final audio to file
-    sf.write(output_filename, final_audio, 24000)
+    sf.write(output_filename, final_audio, TTS_SAMPLE_RATE, subtype='PCM_16')
     print(f"Saved merged audio to: {output_filename}")
+    return len(final_audio)
 
-# Cache for text-to-segments mapping to avoid redundant API calls
-segments_cache = {}
+@njit(cache=True)
+def compute_word_timings(char_lens, is_sentence_end, is_complex, seg_start, seg_duration, total_chars):
+    """
+    Computes the start time and duration of every word in a segment.
+    
+    Words are weighted by character length, with adjustments for reading anomalies:
+    1. Initial pause at paragraph start
+    2. Longer pause after sentence punctuation
+    3. Variable speed based on word complexity
+    """
+    n = char_lens.shape[0]
+    times = np.empty(n, dtype=np.float64)
+    durations = np.empty(n, dtype=np.float64)
+    current_offset = seg_start
+    for i in range(n):
+        if i == 0:
+            # First words may have a slight delay
+            current_offset += 0.05
+        
+        times[i] = current_offset
+        
+        # Weight by character length primarily
+        word_duration = seg_duration * (char_lens[i] / total_chars)
+        if is_sentence_end[i]:
+            word_duration *= 1.3  # 30% longer for sentence endings
+        if is_complex[i]:
+            word_duration *= 1.2  # 20% longer for complex words
+        
+        durations[i] = word_duration
+        current_offset += word_duration
+    return times, durations
+
+def warm_up_word_timings():
+    """
+    Compile (or load from Numba's cache) compute_word_timings ahead of the first request.
+    Call this at startup so a broken Numba setup or cache fails loudly instead of per page.
+    """
+    char_lens = np.array([5, 8], dtype=np.int64)
+    compute_word_timings(char_lens, np.array([False, True]), char_lens > 7, 0.0, 1.0, int(char_lens.sum()))
+
+# Cache for text-to-segments mapping to avoid redundant API calls (persisted across restarts)
+_segments_db = sqlite3.connect(os.path.join(AUDIO_CACHE_DIR, "segments.db"), check_same_thread=False)
+_segments_db.execute("CREATE TABLE IF NOT EXISTS segments (key TEXT PRIMARY KEY, json TEXT)")
+_segments_db.commit()
+_segments_db_lock = threading.Lock()
+
+def is_valid_segments(segments):
+    """Check that segments are a non-empty list of dicts that each have a string text."""
+    return (
+        isinstance(segments, list) and bool(segments)
+        and all(isinstance(seg, dict) and isinstance(seg.get("text"), str) for seg in segments)
+    )
+
+def get_cached_segments(key):
+    """Return the cached segments for a key, or None if they haven't been cached (or are unusable)."""
+    with _segments_db_lock:
+        row = _segments_db.execute("SELECT json FROM segments WHERE key = ?", (key,)).fetchone()
+    if not row:
+        return None
+    segments = orjson.loads(row[0])
+    return segments if is_valid_segments(segments) else None
+
+def cache_segments(key, segments):
+    """
+    Store segments for a key in the persistent cache.
+    Empty or malformed segments are skipped so a later request can retry Groq.
+    """
+    if not is_valid_segments(segments):
+        print(f"[Warning] Not caching invalid segments for {key}.")
+        return
+    with _segments_db_lock:
+        _segments_db.execute("INSERT OR REPLACE INTO segments (key, json) VALUES (?, ?)", (key, orjson.dumps(segments).decode()))
+        _segments_db.commit()
+
+# Cache keys of the WAVs in AUDIO_CACHE_DIR, so cache misses don't need a stat() per request
+_wav_cache = set(f[:-4] for f in os.listdir(AUDIO_CACHE_DIR) if f.endswith(".wav"))
+_wav_cache_lock = threading.Lock()
+
+def is_wav_cached(cache_key, wav_filename):
+    """Check whether a page's WAV is cached, confirming hits on disk in case it was deleted."""
+    with _wav_cache_lock:
+        if cache_key not in _wav_cache:
+            return False
+    if os.path.exists(wav_filename):
+        return True
+    with _wav_cache_lock:
+        _wav_cache.discard(cache_key)
+    return False
+
+def add_cached_wav(cache_key):
+    """Record a newly written WAV in the in-memory cache index."""
+    with _wav_cache_lock:
+        _wav_cache.add(cache_key)
+
+def load_page_segments(segments_filename):
+    """Load the timed segments stored alongside a cached WAV, or None if they're missing."""
+    if not os.path.exists(segments_filename):
+        return None
+    try:
+        with open(segments_filename, "rb") as f:
+            return orjson.loads(f.read())
+    except Exception as e:
+        print(f"[Warning] Could not read stored segments {segments_filename}: {e}")
+        return None
+
+def save_page_segments(segments_filename, segments):
+    """Store timed segments alongside a cached WAV."""
+    try:
+        with open(segments_filename, "wb") as f:
+            f.write(orjson.dumps({"segments": segments, "timing": "word_aligned"}))
+    except Exception as e:
+        print(f"[Warning] Could not store segments {segments_filename}: {e}")
+
+def page_content_hash(stripped_text):
+    """
+    Create a unique identifier for a page based on its content.
+    (blake2b rather than hash() so keys stay stable across restarts)
+    """
+    return hashlib.blake2b(stripped_text.encode('utf-8'), digest_size=8).hexdigest()
 
 def process_page(page_text: str, page_number: int, voice: str = "af_heart"):
     """
@@ -307,23 +667,35 @@ def process_page(page_text: str, page_number: int, voice: str = "af_heart"):
         return {"success": False, "error": "Page text is too short"}
 
     # Create a unique identifier for this page based on content hash
-    content_hash = abs(hash(stripped_text)) % 10000000000
-    timestamp = datetime.now().strftime("%Y%m%d")
-    cache_key = f"{timestamp}_{content_hash}_page_{page_number}"
+    content_hash = page_content_hash(stripped_text)
+    cache_key = f"{content_hash}_{secure_filename(voice)}_page_{page_number}"
     wav_filename = os.path.join(AUDIO_CACHE_DIR, f"{cache_key}.wav")
+    segments_filename = os.path.join(AUDIO_CACHE_DIR, f"{cache_key}.json")
     
     # Check if we already have this audio cached
-    if os.path.exists(wav_filename):
+    if is_wav_cached(cache_key, wav_filename):
         print(f"Using cached WAV audio for {page_id}: {wav_filename}")
         
+        # Prefer the timed segments stored alongside the WAV
+        page_segments = load_page_segments(segments_filename)
+        if page_segments is not None:
+            print(f"Using stored word-aligned segments for {page_id}")
+            return {
+                "success": True,
+                "filename": wav_filename,
+                "segments": page_segments["segments"],
+                "timing": page_segments["timing"]
+            }
+        
         # Check if we have cached segments
         cache_key_segments = f"{content_hash}_segments"
-        if cache_key_segments in segments_cache:
+        cached_segments = get_cached_segments(cache_key_segments)
+        if cached_segments is not None:
             print(f"Using cached segments for {page_id}")
             return {
                 "success": True, 
                 "filename": wav_filename,
-                "segments": segments_cache[cache_key_segments],
+                "segments": cached_segments,
                 "timing": "word_aligned"
             }
         
@@ -333,7 +705,7 @@ def process_page(page_text: str, page_number: int, voice: str = "af_heart"):
             return {"success": False, "error": "Failed to get segments from Groq API"}
         
         # Cache segments for future use
-        segments_cache[cache_key_segments] = data.get("segments", [])
+        cache_segments(cache_key_segments, data.get("segments", []))
         return {
             "success": True, 
             "filename": wav_filename,
@@ -343,9 +715,10 @@ def process_page(page_text: str, page_number: int, voice: str = "af_heart"):
 
     # Check if we have cached segments
     cache_key_segments = f"{content_hash}_segments"
-    if cache_key_segments in segments_cache:
+    cached_segments = get_cached_segments(cache_key_segments)
+    if cached_segments is not None:
         print(f"Using cached segments for {page_id}")
-        data = {"segments": segments_cache[cache_key_segments]}
+        data = {"segments": cached_segments}
     else:
         # Process with Groq API
         data = get_audio_book_segment(stripped_text, page_number)
@@ -354,7 +727,7 @@ def process_page(page_text: str, page_number: int, voice: str = "af_heart"):
             return {"success": False, "error": "Failed to get data from Groq API"}
         
         # Cache segments for future use
-        segments_cache[cache_key_segments] = data.get("segments", [])
+        cache_segments(cache_key_segments, data.get("segments", []))
 
     segments = data.get("segments", [])
     if not segments:
@@ -366,19 +739,27 @@ def process_page(page_text: str, page_number: int, voice: str = "af_heart"):
         print(f"[Warning] Combined text is empty for {page_id}, skipping.")
         return {"success": False, "error": "Combined text is empty"}
 
-    print(f"Generating audio for {page_id} with {len(combined_text)} characters and {count_tokens(combined_text)} tokens.")
+    # Encode once; the token list is reused for counting and chunking
+    encoding = get_encoding()
+    tokens = encoding.encode(combined_text) if encoding is not None else None
+    token_count = len(tokens) if tokens is not None else count_tokens(combined_text)
+    print(f"Generating audio for {page_id} with {len(combined_text)} characters and {token_count} tokens.")
     
     # Generate audio in parallel
     start_time = time.time()
-    synthesize_audio_parallel(combined_text, wav_filename, voice=voice)
+    total_samples = synthesize_audio_parallel(combined_text, wav_filename, voice=voice, tokens=tokens)
     end_time = time.time()
     print(f"Audio generation took {end_time - start_time:.2f} seconds")
     
+    if not total_samples:
+        print(f"[Warning] No audio was generated for {page_id}.")
+        return {"success": False, "error": "Audio synthesis failed"}
+    add_cached_wav(cache_key)
+    
     # Calculate timing metadata for each segment
     try:
         # Get audio duration
-        audio_info = sf.info(wav_filename)
-        total_duration = audio_info.duration
+        total_duration = total_samples / TTS_SAMPLE_RATE
         print(f"Audio duration: {total_duration:.2f} seconds")
         
         # First determine an average speaking rate (chars per second)
@@ -388,37 +769,37 @@ def process_page(page_text: str, page_number: int, voice: str = "af_heart"):
         print(f"Average speaking rate: {avg_char_per_second:.2f} chars/second")
         
         # Calculate better segment durations based on character counts
-        enhanced_segments = []
-        running_offset = 0.0  # Track the current position in seconds
+        segment_texts = [segment["text"] for segment in segments]
+        segment_chars = np.array([len(text) for text in segment_texts], dtype=np.float64)
         
-        for segment in segments:
-            segment_text = segment["text"]
-            segment_chars = len(segment_text)
-            
-            # Estimate duration based on character count and speaking rate
-            # Apply a rate adjustment based on punctuation density
-            punctuation_count = sum(1 for char in segment_text if char in ".,;:!?-")
-            punctuation_density = punctuation_count / max(1, segment_chars)
-            
-            # More punctuation means slower speech rate (more pauses)
-            rate_factor = 1.0 + (punctuation_density * 5.0)  # Up to 6x slower for pure punctuation
-            estimated_duration = (segment_chars / avg_char_per_second) * rate_factor
-            
-            enhanced_segment = {
-                "speaker": segment["speaker"],
-                "text": segment_text,
-                "startTime": running_offset,
-                "endTime": running_offset + estimated_duration
-            }
-            
-            enhanced_segments.append(enhanced_segment)
-            running_offset += estimated_duration
+        # Estimate duration based on character count and speaking rate
+        # Apply a rate adjustment based on punctuation density
+        punctuation_counts = np.array(
+            [len(text) - len(text.translate(_PUNCTUATION_TABLE)) for text in segment_texts],
+            dtype=np.float64
+        )
+        punctuation_density = punctuation_counts / np.maximum(1, segment_chars)
+        
+        # More punctuation means slower speech rate (more pauses)
+        rate_factors = 1.0 + (punctuation_density * 5.0)  # Up to 6x slower for pure punctuation
+        estimated_durations = (segment_chars / avg_char_per_second) * rate_factors
+        end_times = np.cumsum(estimated_durations)
+        start_times = end_times - estimated_durations
         
         # Scale all segment durations to match total audio duration
-        scaling_factor = total_duration / running_offset
-        for segment in enhanced_segments:
-            segment["startTime"] *= scaling_factor
-            segment["endTime"] *= scaling_factor
+        scaling_factor = total_duration / float(end_times[-1])
+        start_times = (start_times * scaling_factor).tolist()
+        end_times = (end_times * scaling_factor).tolist()
+        
+        enhanced_segments = [
+            {
+                "speaker": segment["speaker"],
+                "text": segment["text"],
+                "startTime": start_time,
+                "endTime": end_time
+            }
+            for segment, start_time, end_time in zip(segments, start_times, end_times)
+        ]
         
         # Generate word-level timing
         all_words = []  # Keep track of all words and their starting offsets
@@ -431,60 +812,28 @@ def process_page(page_text: str, page_number: int, voice: str = "af_heart"):
             
             # Split into words
             # Using regex to keep punctuation with the words
-            import re
-            words_with_punct = re.findall(r'\S+', segment_text)
+            words_with_punct = _WORDS_RE.findall(segment_text)
             
             if not words_with_punct:
                 continue
                 
             # Calculate relative word positions with more sophisticated weighting
-            word_timings = []
-            segment_words_chars = sum(len(word) for word in words_with_punct)
+            char_lens = np.array([len(word) for word in words_with_punct], dtype=np.int64)
+            is_sentence_end = np.array([word.endswith(('.', '!', '?')) for word in words_with_punct])
+            is_complex = char_lens > 7  # Arbitrary threshold for "complex" words
+            word_times, _ = compute_word_timings(
+                char_lens, is_sentence_end, is_complex,
+                segment_start, segment_duration, int(char_lens.sum())
+            )
+            word_times = word_times.tolist()
             
-            # Adjust for reading anomalies:
-            # 1. Initial pause at paragraph start
-            # 2. Longer pause after sentence punctuation
-            # 3. Variable speed based on word complexity
+            word_timings = [
+                {"word": word, "time": word_time}
+                for word, word_time in zip(words_with_punct, word_times)
+            ]
             
-            current_offset = segment_start
-            for i, word in enumerate(words_with_punct):
-                # Weight by character length primarily
-                word_weight = len(word) / segment_words_chars
-                
-                # Apply special rules
-                is_first_word = i == 0
-                is_last_word = i == len(words_with_punct) - 1
-                has_sentence_end_punct = re.search(r'[.!?]$', word) is not None
-                is_complex_word = len(word) > 7  # Arbitrary threshold for "complex" words
-                
-                # Apply modifiers
-                if is_first_word:
-                    # First words may have a slight delay
-                    current_offset += 0.05
-                
-                # Calculate this word's timing
-                word_time = current_offset
-                
-                # Calculate duration for this word
-                word_duration = segment_duration * word_weight
-                
-                # Apply special duration modifiers
-                if has_sentence_end_punct:
-                    word_duration *= 1.3  # 30% longer for sentence endings
-                if is_complex_word:
-                    word_duration *= 1.2  # 20% longer for complex words
-                
-                # Store word timing
-                word_timings.append({
-                    "word": word,
-                    "time": word_time
-                })
-                
-                # Keep track of all words for global word position
-                all_words.append((word, word_time))
-                
-                # Update offset for next word
-                current_offset += word_duration
+            # Keep track of all words for global word position
+            all_words.extend(zip(words_with_punct, word_times))
             
             # Ensure the last word's timing still fits within the segment
             if word_timings:
@@ -496,8 +845,11 @@ def process_page(page_text: str, page_number: int, voice: str = "af_heart"):
             print(f"First few words: {all_words[:5]}")
             print(f"Last few words: {all_words[-5:]}")
         
+        # Store the timed segments next to the WAV so cache hits skip Groq entirely
+        save_page_segments(segments_filename, enhanced_segments)
+        
     except Exception as e:
-        print(f"[Warning] Could not calculate timing info: {e}")
+        logger.warning("Could not calculate timing info for %s (%s: %s)", page_id, type(e).__name__, e, exc_info=True)
         enhanced_segments = segments
     
     return {
@@ -507,6 +859,58 @@ def process_page(page_text: str, page_number: int, voice: str = "af_heart"):
         "timing": "word_aligned"
     }
 
+def segments_match_text(segments, text):
+    """Check that the concatenated segment text roughly reproduces the given page text."""
+    if not isinstance(segments, list):
+        return False
+    segment_words = " ".join(
+        seg["text"] for seg in segments if isinstance(seg, dict) and isinstance(seg.get("text"), str)
+    ).split()
+    text_words = text.split()
+    if segment_words == text_words:
+        return True
+    return difflib.SequenceMatcher(None, segment_words, text_words, autojunk=False).ratio() >= SEGMENT_MATCH_THRESHOLD
+
+def prefetch_page_segments(pages: list):
+    """
+    Fetches segments for all uncached pages with as few batched Groq calls as the output token
+    limit allows and caches them, so that process_page finds them in the segments cache.
+    Pages the batch call fails to return fall back to per-page calls inside process_page.
+    """
+    missing = {}
+    for page_number, page_text in pages:
+        stripped_text = page_text.strip()
+        if len(stripped_text) < 100:
+            continue  # process_page rejects these anyway
+        cache_key_segments = f"{page_content_hash(stripped_text)}_segments"
+        if get_cached_segments(cache_key_segments) is None:
+            missing[page_number] = (stripped_text, cache_key_segments)
+    
+    if not missing:
+        return
+    
+    # The output repeats every page verbatim, so split the pages to keep each response under the token limit
+    batches = [[]]
+    batch_tokens = 0
+    for page_number, (stripped_text, _) in missing.items():
+        page_tokens = count_tokens(stripped_text)
+        if batches[-1] and batch_tokens + page_tokens > GROQ_BATCH_TOKEN_BUDGET:
+            batches.append([])
+            batch_tokens = 0
+        batches[-1].append((page_number, stripped_text))
+        batch_tokens += page_tokens
+    
+    print(f"Fetching segments for {len(missing)} pages in {len(batches)} Groq request(s)...")
+    for batch in batches:
+        page_segments = get_audio_book_segments_batch(batch)
+        for page_number, segments in page_segments.items():
+            stripped_text, cache_key_segments = missing[page_number]
+            # Segments are cached permanently, so don't trust the page number the model echoed back
+            if not segments_match_text(segments, stripped_text):
+                print(f"[Warning] Batched segments for page {page_number} don't match its text, not caching them.")
+                continue
+            cache_segments(cache_key_segments, segments)
+
 # Define API routes
 @app.route("/api/health", methods=["GET"])
 def health_check():
@@ -558,25 +962,81 @@ def api_process_page():
         print(f"[Error] Exception in process_page API: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route("/api/process-pages", methods=["POST"])
+def api_process_pages():
+    """
+    Process several pages with a single Groq request and return audio files and segments for each
+    
+    Expects a JSON payload with:
+    - pages: List of objects with page_text and page_number
+    - voice: (optional) The voice to use for TTS
+    
+    Returns:
+    - pages: List with, for each page, page_number, success, and either
+      audio_url and segments or an error message
+    - success: Boolean indicating if the request was processed
+    """
+    try:
+        data = request.json
+        if not data or not isinstance(data.get("pages"), list) or not data["pages"]:
+            return jsonify({"success": False, "error": "Missing required parameters"}), 400
+        if any(not isinstance(page, dict) or "page_text" not in page or "page_number" not in page for page in data["pages"]):
+            return jsonify({"success": False, "error": "Each page requires page_text and page_number"}), 400
+        
+        pages = [(int(page["page_number"]), page["page_text"]) for page in data["pages"]]
+        voice = data.get("voice", "af_heart")
+        
+        try:
+            prefetch_page_segments(pages)
+        except Exception:
+            # Each page falls back to its own Groq request in process_page
+            logger.warning("Batched segment prefetch failed", exc_info=True)
+        
+        # Synthesize all pages concurrently now that their segments are cached
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(MAX_PAGE_WORKERS, len(pages))) as executor:
+            results = list(executor.map(lambda page: process_page(page[1], page[0], voice), pages))
+        
+        page_results = []
+        for (page_number, _), result in zip(pages, results):
+            if result["success"]:
+                page_results.append({
+                    "page_number": page_number,
+                    "success": True,
+                    "audio_url": f"/audio/{os.path.basename(result['filename'])}",
+                    "segments": result["segments"],
+                    "timing": "word_aligned"
+                })
+            else:
+                page_results.append({"page_number": page_number, "success": False, "error": result["error"]})
+        
+        return jsonify({"success": True, "pages": page_results})
+    
+    except Exception as e:
+        print(f"[Error] Exception in process_pages API: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @app.route("/api/audio/<filename>", methods=["GET"])
 def get_audio(filename):
     """Serve an audio file from the cache directory"""
     try:
-        file_path = os.path.join(AUDIO_CACHE_DIR, filename)
-        if not os.path.exists(file_path):
-            return jsonify({"success": False, "error": "Audio file not found"}), 404
+        # Only audio is served; the cache directory also holds the segments database
+        if not filename.endswith(".wav"):
+            raise NotFound()
         
-        # Always use audio/wav mime type
-        mimetype = "audio/wav"
+        # Always use audio/wav mime type; conditional + etag let the server use zero-copy sendfile
+        response = send_from_directory(
+            AUDIO_CACHE_DIR, filename, mimetype="audio/wav",
+            conditional=True, etag=True, max_age=3600  # Cache for 1 hour
+        )
         
         # Add CORS headers specifically for audio files
-        response = send_file(file_path, mimetype=mimetype)
         response.headers.add('Access-Control-Allow-Origin', '*')
         response.headers.add('Access-Control-Allow-Headers', 'Content-Type')
         response.headers.add('Access-Control-Allow-Methods', 'GET')
-        response.headers.add('Cache-Control', 'public, max-age=3600')  # Cache for 1 hour
         return response
     
+    except NotFound:
+        return jsonify({"success": False, "error": "Audio file not found"}), 404
     except Exception as e:
         print(f"[Error] Exception serving audio file: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
@@ -598,8 +1058,9 @@ def get_voices():
 if __name__ == "__main__":
     # Preload TTS model to improve first request performance
     print("Preloading TTS models...")
-    get_tts_pipeline("af_heart")
+    get_tts_pool("af_heart")
+    warm_up_word_timings()
     
     print("Starting PDF-to-Audio API with Groq integration")
     print(f"Audio cache directory: {os.path.abspath(AUDIO_CACHE_DIR)}")
-    app.run(host="0.0.0.0", port=4567, debug=True) 
\ No newline at end of file
+    app.run(host="0.0.0.0", port=4567) 
\ No newline at end of file
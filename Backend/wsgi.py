@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+WSGI entry point for running the PDF-to-Audio API under gunicorn.
+
+The API script's file name isn't a valid module name, so it is loaded by path here.
+
+Usage:
+    gunicorn -c gunicorn_conf.py
+"""
+
+import os
+import sys
+import importlib.util
+
+_spec = importlib.util.spec_from_file_location(
+    "pdf_to_audio_api",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "pdf-to-audio-api.py")
+)
+pdf_to_audio_api = importlib.util.module_from_spec(_spec)
+# Register the module before running it so Numba can re-import it when loading cached functions
+sys.modules[_spec.name] = pdf_to_audio_api
+_spec.loader.exec_module(pdf_to_audio_api)
+
+# Preload TTS model and compile the word-timing JIT once at import so every request hits a warm path
+print("Preloading TTS models...")
+pdf_to_audio_api.get_tts_pool("af_heart")
+pdf_to_audio_api.warm_up_word_timings()
+
+app = pdf_to_audio_api.app